@@ -189,13 +189,15 @@ class BaseModel(ABC):
             self.model = self.model.to(self.device)
 
     def _send_data_to_given_device(self, data) -> Iterable:
+        # non_blocking makes host-to-device copies from pinned memory asynchronous,
+        # and it has no effect if the data is not in pinned memory
         if isinstance(self.device, torch.device):  # single device
-            data = map(lambda x: x.to(self.device), data)
+            data = map(lambda x: x.to(self.device, non_blocking=True), data)
         else:  # parallely training on multiple devices
             # randomly choose one device to balance the workload
             # device = np.random.choice(self.device)
 
-            data = map(lambda x: x.cuda(), data)
+            data = map(lambda x: x.cuda(non_blocking=True), data)
 
         return data
 
@@ -516,6 +518,33 @@ class BaseNNModel(BaseModel):
             f"the number of trainable parameters: {self.num_params:,}"
         )
 
+    def _compile_model(self, mode: str = "reduce-overhead", fullgraph: bool = False) -> None:
+        """Compile the initialized NN model in place with :func:`torch.compile`.
+
+        The model is compiled in place with :meth:`torch.nn.Module.compile`, so the keys in its state dict are kept
+        unchanged and the saved model files are still compatible with the uncompiled model.
+        Note that the compiled forward pass only takes effect when the model is called as ``self.model(...)``,
+        calling ``self.model.forward(...)`` directly bypasses it and runs eagerly.
+
+        Parameters
+        ----------
+        mode :
+            The compilation mode, e.g. "default", "reduce-overhead", "max-autotune".
+            "reduce-overhead" captures the forward pass with CUDA Graphs to cut down the Python overhead.
+
+        fullgraph :
+            Whether to require the whole forward pass to be captured as a single graph without graph breaks.
+
+        """
+        if not hasattr(self.model, "compile"):
+            logger.warning(
+                f"‼️ Compiling the model needs PyTorch >= 2.2, but got {torch.__version__}. Skipped compiling."
+            )
+            return
+
+        self.model.compile(mode=mode, fullgraph=fullgraph)
+        logger.info(f"Model has been compiled with torch.compile(mode={mode}, fullgraph={fullgraph})")
+
     @abstractmethod
     def fit(
         self,
@@ -282,7 +282,7 @@ class BaseNNImputer(BaseNNModel):
                     training_step += 1
                     inputs = self._assemble_input_for_training(data)
                     self.optimizer.zero_grad()
-                    results = self.model.forward(inputs)
+                    results = self.model(inputs)
                     # use sum() before backward() in case of multi-gpu training
                     results["loss"].sum().backward()
                     self.optimizer.step()
@@ -301,10 +301,15 @@ class BaseNNImputer(BaseNNModel):
                     with torch.no_grad():
                         for idx, data in enumerate(val_loader):
                             inputs = self._assemble_input_for_validating(data)
-                            results = self.model.forward(inputs, training=False)
+                            results = self.model(inputs, training=False)
+                            imputed_data = results["imputed_data"]
+                            if inputs["X_ori"].device != imputed_data.device:
+                                # the targets may be kept on the host to save host-to-device copies,
+                                # then calculate the metric on the host
+                                imputed_data = imputed_data.to(inputs["X_ori"].device)
                             imputation_mse = (
                                 calc_mse(
-                                    results["imputed_data"],
+                                    imputed_data,
                                     inputs["X_ori"],
                                     inputs["indicating_mask"],
                                 )
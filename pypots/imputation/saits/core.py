@@ -32,6 +32,8 @@ class _SAITS(nn.Module):
         diagonal_attention_mask: bool = True,
         ORT_weight: float = 1,
         MIT_weight: float = 1,
+        gradient_checkpointing: bool = False,
+        memory_efficient_attention: bool = False,
         customized_loss_func: Callable = calc_mae,
     ):
         super().__init__()
@@ -41,6 +43,13 @@ class _SAITS(nn.Module):
         self.ORT_weight = ORT_weight
         self.MIT_weight = MIT_weight
         self.customized_loss_func = customized_loss_func
+        # the diagonal attention mask is fixed for the given n_steps, so build it once and keep it on the device
+        # with the model, True means the position taking part in the attention, i.e. mask out the diagonal
+        self.register_buffer(
+            "diag_attn_mask",
+            ~torch.eye(n_steps, dtype=torch.bool),
+            persistent=False,
+        )
 
         self.encoder = BackboneSAITS(
             n_steps,
@@ -53,6 +62,8 @@ class _SAITS(nn.Module):
             d_ffn,
             dropout,
             attn_dropout,
+            gradient_checkpointing,
+            memory_efficient_attention,
         )
 
     def forward(
@@ -60,14 +71,14 @@ class _SAITS(nn.Module):
         inputs: dict,
         diagonal_attention_mask: bool = True,
         training: bool = True,
+        return_latent_vars: bool = False,
     ) -> dict:
         X, missing_mask = inputs["X"], inputs["missing_mask"]
 
         # determine the attention mask
         if (training and self.diagonal_attention_mask) or ((not training) and diagonal_attention_mask):
-            diagonal_attention_mask = (1 - torch.eye(self.n_steps)).to(X.device)
-            # then broadcast on the batch axis
-            diagonal_attention_mask = diagonal_attention_mask.unsqueeze(0)
+            # broadcast the cached mask on the batch axis
+            diagonal_attention_mask = self.diag_attn_mask.unsqueeze(0)
         else:
             diagonal_attention_mask = None
 
@@ -79,7 +90,7 @@ class _SAITS(nn.Module):
             first_DMSA_attn_weights,
             second_DMSA_attn_weights,
             combining_weights,
-        ) = self.encoder(X, missing_mask, diagonal_attention_mask)
+        ) = self.encoder(X, missing_mask, diagonal_attention_mask, return_latent_vars)
 
         # replace the observed part with values from X
         imputed_data = missing_mask * X + (1 - missing_mask) * X_tilde_3
@@ -99,11 +110,12 @@ class _SAITS(nn.Module):
             # calculate loss for the observed reconstruction task (ORT)
             # this calculation is more complicated that pypots.nn.modules.saits.SaitsLoss because
             # SAITS model structure has three parts of representation
-            ORT_loss = 0
-            ORT_loss += self.customized_loss_func(X_tilde_1, X, missing_mask)
-            ORT_loss += self.customized_loss_func(X_tilde_2, X, missing_mask)
-            ORT_loss += self.customized_loss_func(X_tilde_3, X, missing_mask)
-            ORT_loss /= 3
+            # accumulate out of place, the in-place ops on the loss break torch.compile at the graph breaks
+            # in the loss function
+            ORT_loss = self.customized_loss_func(X_tilde_1, X, missing_mask)
+            ORT_loss = ORT_loss + self.customized_loss_func(X_tilde_2, X, missing_mask)
+            ORT_loss = ORT_loss + self.customized_loss_func(X_tilde_3, X, missing_mask)
+            ORT_loss = ORT_loss / 3
             ORT_loss = self.ORT_weight * ORT_loss
 
             # calculate loss for the masked imputation task (MIT)
@@ -6,7 +6,7 @@ The implementation of SAITS for the partially-observed time-series imputation ta
 # Created by Wenjie Du <wenjay.du@gmail.com>
 # License: BSD-3-Clause
 
-from typing import Union, Optional, Callable
+from typing import Union, Optional, Callable, Iterator
 
 import numpy as np
 import torch
@@ -17,7 +17,7 @@ from .data import DatasetForSAITS
 from ..base import BaseNNImputer
 from ...data.checking import key_in_data_set
 from ...data.dataset import BaseDataset
-from ...optim.adam import Adam
+from ...optim.adamw import AdamW
 from ...optim.base import Optimizer
 from ...utils.logging import logger
 from ...utils.metrics import calc_mae
@@ -73,6 +73,36 @@ class SAITS(BaseNNImputer):
     MIT_weight :
         The weight for the MIT loss.
 
+    gradient_checkpointing :
+        Whether to enable gradient checkpointing on the DMSA layers during training.
+        If so, activations of each layer won't be kept in memory but recomputed in the backward pass,
+        which trades extra computation for a lower memory footprint,
+        and helps train the model with a larger batch size or longer sequences on the same device.
+
+    memory_efficient_attention :
+        Whether to compute the DMSA with the memory-efficient attention algorithm in pure PyTorch, which processes
+        keys chunk by chunk and never materializes the full [n_steps, n_steps] attention map. In training with
+        PyTorch >= 1.11, the chunks are recomputed in the backward pass rather than kept in memory, which trades extra
+        computation for memory.
+        It works on CPUs as well, and doesn't apply to layers whose attention maps are returned,
+        e.g. when calling ``predict()`` with ``return_latent_vars=True``.
+
+    precision :
+        The numerical precision for running inference in ``predict()``. It has to be one of ["fp32", "fp16", "bf16"].
+        With "fp16" or "bf16", the forward pass will run under :class:`torch.autocast` with mixed precision,
+        which speeds up the inference and reduces memory usage on devices with tensor cores.
+        "bf16" is recommended on Ampere and later NVIDIA GPUs. The default "fp32" keeps full precision.
+
+    allow_tf32 :
+        Whether to allow TensorFloat-32 (TF32) tensor cores for float32 matmuls and convolutions on NVIDIA Ampere
+        and later GPUs (compute capability >= 8.0). TF32 keeps the float32 range but computes with a 10-bit mantissa,
+        which makes the GEMM-dominated DMSA and FFN layers several times faster with negligible accuracy loss for
+        the imputation task. Note that it is a global setting of PyTorch, and it has no effect on other devices.
+
+    compile :
+        Whether to compile the model with :func:`torch.compile` (mode "reduce-overhead") to speed up the training
+        and inference. It needs PyTorch >= 2.2, and the first few steps will be slower because of the compilation.
+
     batch_size :
         The batch size for training and evaluating the model.
 
@@ -90,12 +120,26 @@ class SAITS(BaseNNImputer):
 
     optimizer :
         The optimizer for model training.
-        If not given, will use a default Adam optimizer.
+        If not given, will use a default AdamW optimizer,
+        which runs with the fused implementation if the model is on CUDA devices.
 
     num_workers :
         The number of subprocesses to use for data loading.
         `0` means data loading will be in the main process, i.e. there won't be subprocesses.
 
+    prefetch_factor :
+        The number of batches loaded in advance by each worker.
+        It only works when ``num_workers`` > 0.
+
+    persistent_workers :
+        Whether to keep the data loading workers alive between epochs rather than respawning them at each epoch.
+        It only works when ``num_workers`` > 0.
+
+    pin_memory :
+        Whether to load batches into pinned (page-locked) host memory, which makes host-to-device copies faster and
+        asynchronous. If not given, it will be enabled when the model runs on CUDA devices.
+        Note that pinned memory can take up much host RAM with a large ``prefetch_factor``.
+
     device :
         The device for the model to run on. It can be a string, a :class:`torch.device` object, or a list of them.
         If not given, will try to use CUDA devices first (will use the default CUDA device if there are multiple),
@@ -135,12 +179,20 @@ class SAITS(BaseNNImputer):
         diagonal_attention_mask: bool = True,
         ORT_weight: int = 1,
         MIT_weight: int = 1,
+        gradient_checkpointing: bool = False,
+        memory_efficient_attention: bool = False,
+        precision: str = "fp32",
+        allow_tf32: bool = True,
+        compile: bool = False,
         batch_size: int = 32,
         epochs: int = 100,
         patience: Optional[int] = None,
         customized_loss_func: Callable = calc_mae,
-        optimizer: Optional[Optimizer] = Adam(),
+        optimizer: Optional[Optimizer] = AdamW(),
         num_workers: int = 0,
+        prefetch_factor: int = 4,
+        persistent_workers: bool = True,
+        pin_memory: Optional[bool] = None,
         device: Optional[Union[str, torch.device, list]] = None,
         saving_path: Optional[str] = None,
         model_saving_strategy: Optional[str] = "best",
@@ -165,6 +217,9 @@ class SAITS(BaseNNImputer):
             d_model = n_heads * d_k
             logger.warning(f"⚠️ d_model is reset to {d_model} = n_heads ({n_heads}) * d_k ({d_k})")
 
+        precision_options = ["fp32", "fp16", "bf16"]
+        assert precision in precision_options, f"precision must be one of {precision_options}, but got {precision}."
+
         self.n_steps = n_steps
         self.n_features = n_features
         # model hype-parameters
@@ -179,6 +234,19 @@ class SAITS(BaseNNImputer):
         self.diagonal_attention_mask = diagonal_attention_mask
         self.ORT_weight = ORT_weight
         self.MIT_weight = MIT_weight
+        self.gradient_checkpointing = gradient_checkpointing
+        self.memory_efficient_attention = memory_efficient_attention
+        self.precision = precision
+        self.compile = compile
+        self._quantized = False
+
+        # data loading settings
+        self.prefetch_factor = prefetch_factor
+        self.persistent_workers = persistent_workers
+        if pin_memory is None:
+            # use pinned memory on CUDA devices for faster and asynchronous host-to-device copies
+            pin_memory = isinstance(self.device, list) or self.device.type == "cuda"
+        self.pin_memory = pin_memory
 
         # set up the model
         self.model = _SAITS(
@@ -195,9 +263,15 @@ class SAITS(BaseNNImputer):
             self.diagonal_attention_mask,
             self.ORT_weight,
             self.MIT_weight,
+            self.gradient_checkpointing,
+            self.memory_efficient_attention,
         )
         self._print_model_size()
         self._send_model_to_given_device()
+        if allow_tf32:
+            self._enable_tf32()
+        if compile:
+            self._compile_model(mode="reduce-overhead", fullgraph=False)
 
         # set up the loss function
         self.customized_loss_func = customized_loss_func
@@ -206,6 +280,30 @@ class SAITS(BaseNNImputer):
         self.optimizer = optimizer
         self.optimizer.init_optimizer(self.model.parameters())
 
+    def _get_main_device(self) -> torch.device:
+        # the outputs are gathered on the first device when the model runs on multiple devices
+        return self.device[0] if isinstance(self.device, list) else self.device
+
+    def _enable_tf32(self) -> None:
+        device = self._get_main_device()
+        # TF32 tensor cores are only available on Ampere and later GPUs
+        if device.type == "cuda" and torch.cuda.get_device_capability(device)[0] >= 8:
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            torch.set_float32_matmul_precision("high")
+            logger.info("TF32 has been enabled for float32 matmuls and convolutions")
+
+    def _get_dataloader_kwargs(self) -> dict:
+        kwargs = {
+            "num_workers": self.num_workers,
+            "pin_memory": self.pin_memory,
+        }
+        # below arguments only work with multiprocess data loading
+        if self.num_workers > 0:
+            kwargs["prefetch_factor"] = self.prefetch_factor
+            kwargs["persistent_workers"] = self.persistent_workers
+        return kwargs
+
     def _assemble_input_for_training(self, data: list) -> dict:
         (
             indices,
@@ -225,7 +323,19 @@ class SAITS(BaseNNImputer):
         return inputs
 
     def _assemble_input_for_validating(self, data: list) -> dict:
-        return self._assemble_input_for_training(data)
+        indices, X, missing_mask, X_ori, indicating_mask = data
+        # only the model input is sent to the device, X_ori and indicating_mask are only for the validation metric,
+        # so they are kept on the host to save the host-to-device copies
+        X, missing_mask = self._send_data_to_given_device([X, missing_mask])
+
+        inputs = {
+            "X": X,
+            "missing_mask": missing_mask,
+            "X_ori": X_ori,
+            "indicating_mask": indicating_mask,
+        }
+
+        return inputs
 
     def _assemble_input_for_testing(self, data: list) -> dict:
         indices, X, missing_mask = self._send_data_to_given_device(data)
@@ -236,19 +346,54 @@ class SAITS(BaseNNImputer):
         }
         return inputs
 
+    def _prefetch_input_for_testing(self, test_loader: DataLoader) -> Iterator[dict]:
+        """Yield the assembled testing inputs batch by batch. On CUDA devices, the host-to-device copy of
+        the next batch is launched on a dedicated stream, hence overlaps with the computation of the current batch.
+        """
+        device_type = "cuda" if isinstance(self.device, list) else self.device.type
+        if device_type != "cuda":
+            for data in test_loader:
+                yield self._assemble_input_for_testing(data)
+            return
+
+        # the streams have to be on the device of the model, rather than the current device by default
+        main_device = self._get_main_device()
+        h2d_stream = torch.cuda.Stream(device=main_device)
+        current_stream = torch.cuda.current_stream(main_device)
+        inputs = None
+        for data in test_loader:
+            with torch.cuda.stream(h2d_stream):
+                next_inputs = self._assemble_input_for_testing(data)
+            if inputs is not None:
+                # the computation of the current batch is launched by the caller before the next batch arrives
+                yield inputs
+            # the computation on the current stream has to wait for the copy of the next batch
+            current_stream.wait_stream(h2d_stream)
+            for value in next_inputs.values():
+                # the tensors are allocated on the copy stream, but consumed on the current stream
+                value.record_stream(current_stream)
+            inputs = next_inputs
+
+        if inputs is not None:
+            yield inputs
+
     def fit(
         self,
         train_set: Union[dict, str],
         val_set: Optional[Union[dict, str]] = None,
         file_type: str = "hdf5",
     ) -> None:
+        if self._quantized:
+            # the optimizer still holds the float parameters, and the quantized model can't be trained
+            raise RuntimeError("The model has been quantized for inference and cannot be trained any more.")
+
         # Step 1: wrap the input data with classes Dataset and DataLoader
         training_set = DatasetForSAITS(train_set, return_X_ori=False, return_y=False, file_type=file_type)
         training_loader = DataLoader(
             training_set,
             batch_size=self.batch_size,
             shuffle=True,
-            num_workers=self.num_workers,
+            **self._get_dataloader_kwargs(),
         )
         val_loader = None
         if val_set is not None:
@@ -259,7 +404,7 @@ class SAITS(BaseNNImputer):
                 val_set,
                 batch_size=self.batch_size,
                 shuffle=False,
-                num_workers=self.num_workers,
+                **self._get_dataloader_kwargs(),
             )
 
         # Step 2: train the model and freeze it
@@ -319,38 +464,84 @@ class SAITS(BaseNNImputer):
             test_set,
             batch_size=self.batch_size,
             shuffle=False,
-            num_workers=self.num_workers,
+            **self._get_dataloader_kwargs(),
         )
-        imputation_collector = []
-        first_DMSA_attn_weights_collector = []
-        second_DMSA_attn_weights_collector = []
-        combining_weights_collector = []
-
-        # Step 2: process the data with the model
-        with torch.no_grad():
-            for idx, data in enumerate(test_loader):
-                inputs = self._assemble_input_for_testing(data)
-                results = self.model.forward(inputs, diagonal_attention_mask, training=False)
-                imputation_collector.append(results["imputed_data"])
+        # allocate the output buffers on the host for the whole test set and fill them batch by batch,
+        # pinned memory makes the device-to-host copies asynchronous
+        device_type = "cuda" if isinstance(self.device, list) else self.device.type
+        pin_memory = self.pin_memory and device_type == "cuda"
+        n_samples = len(test_set)
+        imputation = torch.empty(
+            (n_samples, self.n_steps, self.n_features),
+            dtype=torch.float32,
+            pin_memory=pin_memory,
+        )
+        latent_var_names = ["first_DMSA_attn_weights", "second_DMSA_attn_weights", "combining_weights"]
+        latent_var_collector = {}
+        # latent variables are large (e.g. attention maps in shape of [batch_size, n_heads, n_steps, n_steps]),
+        # copy them on a dedicated stream to overlap the copies with the computation of the following batches.
+        # Not for the compiled model, whose outputs are static CUDA-graph buffers overwritten by the next batch
+        main_device = self._get_main_device()
+        copy_stream = (
+            torch.cuda.Stream(device=main_device) if (return_latent_vars and pin_memory and not self.compile) else None
+        )
+        offset = 0
+
+        # Step 2: process the data with the model, in mixed precision if required
+        autocast_dtype = torch.bfloat16 if self.precision == "bf16" else torch.float16
+        with torch.no_grad(), torch.autocast(
+            device_type,
+            dtype=autocast_dtype,
+            enabled=self.precision != "fp32",
+        ):
+            for inputs in self._prefetch_input_for_testing(test_loader):
+                results = self.model(
+                    inputs,
+                    diagonal_attention_mask,
+                    training=False,
+                    return_latent_vars=return_latent_vars,
+                )
+                # copy_() casts the results back to fp32 if the inference runs in half precision
+                batch_size = results["imputed_data"].shape[0]
+                imputation[offset : offset + batch_size].copy_(results["imputed_data"], non_blocking=True)
 
                 if return_latent_vars:
-                    first_DMSA_attn_weights_collector.append(results["first_DMSA_attn_weights"].cpu().numpy())
-                    second_DMSA_attn_weights_collector.append(results["second_DMSA_attn_weights"].cpu().numpy())
-                    combining_weights_collector.append(results["combining_weights"].cpu().numpy())
+                    if len(latent_var_collector) == 0:
+                        # allocate the buffers once the shapes of the latent variables are known
+                        for name in latent_var_names:
+                            latent_var_collector[name] = torch.empty(
+                                (n_samples, *results[name].shape[1:]),
+                                dtype=torch.float32,
+                                pin_memory=pin_memory,
+                            )
+
+                    if copy_stream is not None:
+                        # the copy stream has to wait for the computation producing the latent variables
+                        copy_stream.wait_stream(torch.cuda.current_stream(main_device))
+                        with torch.cuda.stream(copy_stream):
+                            for name in latent_var_names:
+                                latent_var_collector[name][offset : offset + batch_size].copy_(
+                                    results[name], non_blocking=True
+                                )
+                                # don't let the caching allocator reuse the memory before the copy is done
+                                results[name].record_stream(copy_stream)
+                    else:
+                        for name in latent_var_names:
+                            latent_var_collector[name][offset : offset + batch_size].copy_(results[name])
+
+                offset += batch_size
 
         # Step 3: output collection and return
-        imputation = torch.cat(imputation_collector).cpu().detach().numpy()
+        if pin_memory:
+            # wait for all the asynchronous copies to finish, synchronize() only waits for the current device
+            # if not given one, which may not be the device the model runs on
+            torch.cuda.synchronize(self._get_main_device())
         result_dict = {
-            "imputation": imputation,
+            "imputation": imputation.numpy(),
         }
 
         if return_latent_vars:
-            latent_var_collector = {
-                "first_DMSA_attn_weights": np.concatenate(first_DMSA_attn_weights_collector),
-                "second_DMSA_attn_weights": np.concatenate(second_DMSA_attn_weights_collector),
-                "combining_weights": np.concatenate(combining_weights_collector),
-            }
-            result_dict["latent_vars"] = latent_var_collector
+            result_dict["latent_vars"] = {name: buffer.numpy() for name, buffer in latent_var_collector.items()}
 
         return result_dict
 
@@ -378,3 +569,41 @@ class SAITS(BaseNNImputer):
 
         result_dict = self.predict(test_set, file_type=file_type)
         return result_dict["imputation"]
+
+    def quantize(self, dtype: torch.dtype = torch.qint8) -> None:
+        """Dynamically quantize the linear layers of the trained model for faster inference on CPUs.
+
+        The weights of all :class:`torch.nn.Linear` layers, including the packed QKV projections in the DMSA blocks
+        and the linear layers in the FFNs, are converted into ``dtype`` ahead of time, and the activations are
+        quantized on the fly with their dynamic ranges. With int8 weights, the model is about 4 times smaller and
+        the GEMMs run faster on CPUs with int8 dot-product instructions (e.g. x86 VNNI and ARM dotprod).
+
+        Notes
+        -----
+        The quantized model only runs on CPUs and can only be used for inference, so the model will be moved
+        to CPU. Please call this function after the training is finished, calling ``fit()`` afterwards will raise
+        a RuntimeError, because the quantized weights have no gradients and the optimizer still holds the float ones.
+        The quantized model can be saved with ``save()``, but can only be loaded into a quantized model.
+        The latent variables returned by ``predict()`` with ``return_latent_vars=True`` are computed from the
+        quantized projections as well, hence they are approximations of the ones from the float model.
+
+        Parameters
+        ----------
+        dtype :
+            The data type of the quantized weights, torch.qint8 or torch.float16.
+
+        """
+        assert dtype in [torch.qint8, torch.float16], f"dtype should be torch.qint8 or torch.float16, but got {dtype}"
+        assert not isinstance(self.device, list), "quantization doesn't support models on multiple devices"
+        assert not self._quantized, "the model has already been quantized"
+
+        if self.device.type != "cpu":
+            logger.warning(f"‼️ The quantized model only runs on CPUs, moving it from {self.device} to CPU.")
+            self.device = torch.device("cpu")
+            self.model = self.model.to(self.device)
+            # pinned memory only helps the host-to-device copies, which are not needed any more
+            self.pin_memory = False
+
+        self.model.eval()
+        self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=dtype)
+        self._quantized = True
@@ -6,10 +6,18 @@ and takes over the forward progress of the algorithm.
 # Created by Jun Wang <jwangfx@connect.ust.hk> and Wenjie Du <wenjay.du@gmail.com>
 # License: BSD-3-Clause
 
+import torch
 import torch.nn as nn
 
 from ...nn.modules.usgan import BackboneUSGAN
 
+try:
+    _dynamo_disable = torch._dynamo.disable
+except AttributeError:  # torch._dynamo is not available in PyTorch < 2.0
+
+    def _dynamo_disable(fn):
+        return fn
+
 
 class _USGAN(nn.Module):
     """USGAN model"""
@@ -33,36 +41,44 @@ class _USGAN(nn.Module):
             dropout_rate,
         )
 
-    def forward(
+    def forward_generator(
         self,
         inputs: dict,
-        training_object: str = "generator",
         training: bool = True,
     ) -> dict:
-        assert training_object in [
-            "generator",
-            "discriminator",
-        ], 'training_object should be "generator" or "discriminator"'
+        imputed_data, generation_loss = self.backbone.forward_generator(inputs, training)
 
-        results = {}
+        results = {"imputed_data": imputed_data}
+        # if in training mode, return results with losses
         if training:
-            if training_object == "discriminator":
-                imputed_data, discrimination_loss = self.backbone(inputs, training_object, training)
-                loss = discrimination_loss
-            else:
-                imputed_data, generation_loss = self.backbone(
-                    inputs,
-                    training_object,
-                    training,
-                )
-                loss = generation_loss
-            results["loss"] = loss
-        else:
-            imputed_data = self.backbone(
-                inputs,
-                training_object,
-                training,
-            )
+            results["loss"] = generation_loss
+        return results
+
+    def forward_discriminator(
+        self,
+        inputs: dict,
+        training: bool = True,
+    ) -> dict:
+        imputed_data, discrimination_loss = self.backbone.forward_discriminator(inputs, training)
 
-        results["imputed_data"] = imputed_data
+        results = {"imputed_data": imputed_data}
+        # if in training mode, return results with losses
+        if training:
+            results["loss"] = discrimination_loss
         return results
+
+    @_dynamo_disable
+    def forward(
+        self,
+        inputs: dict,
+        training_object: str = "generator",
+        training: bool = True,
+    ) -> dict:
+        # kept for backward compatibility, call forward_generator() or forward_discriminator() directly instead,
+        # which don't branch on the string and can be compiled as static graphs
+        if training_object == "generator":
+            return self.forward_generator(inputs, training)
+        elif training_object == "discriminator":
+            return self.forward_discriminator(inputs, training)
+        else:
+            raise ValueError(f'training_object should be "generator" or "discriminator", but got {training_object}')
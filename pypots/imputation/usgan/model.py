@@ -51,6 +51,11 @@ class USGAN(BaseNNImputer):
     dropout : float
         The dropout rate for the last layer in Discriminator
 
+    compile : bool
+        Whether to compile the generator and discriminator forward passes separately with :func:`torch.compile`
+        (mode "reduce-overhead") to speed up the training and inference. It needs PyTorch >= 2.0,
+        and the first few steps will be slower because of the compilation.
+
     G_steps : int
         The number of steps to train the generator in each iteration.
 
@@ -109,6 +114,7 @@ class USGAN(BaseNNImputer):
         lambda_mse: float = 1,
         hint_rate: float = 0.7,
         dropout: float = 0.0,
+        compile: bool = False,
         G_steps: int = 1,
         D_steps: int = 1,
         batch_size: int = 32,
@@ -151,6 +157,13 @@ class USGAN(BaseNNImputer):
         self._send_model_to_given_device()
         self._print_model_size()
 
+        # the generator and discriminator steps are routed to their own forward methods,
+        # so neither of them branches on the training object and they can be compiled separately
+        self._forward_generator = self.model.forward_generator
+        self._forward_discriminator = self.model.forward_discriminator
+        if compile:
+            self._compile_model(mode="reduce-overhead", fullgraph=False)
+
         # set up the optimizer
         self.G_optimizer = G_optimizer
         self.G_optimizer.init_optimizer(self.model.backbone.generator.parameters())
@@ -222,6 +235,19 @@ class USGAN(BaseNNImputer):
     def _assemble_input_for_testing(self, data: list) -> dict:
         return self._assemble_input_for_training(data)
 
+    def _compile_model(self, mode: str = "reduce-overhead", fullgraph: bool = False) -> None:
+        if not hasattr(torch, "compile"):
+            logger.warning(
+                f"‼️ Compiling the model needs PyTorch >= 2.0, but got {torch.__version__}. Skipped compiling."
+            )
+            return
+
+        # compile the generator and discriminator forward methods separately rather than the module in place,
+        # the compiled functions are kept out of self.model, so the model can still be pickled and saved
+        self._forward_generator = torch.compile(self.model.forward_generator, mode=mode, fullgraph=fullgraph)
+        self._forward_discriminator = torch.compile(self.model.forward_discriminator, mode=mode, fullgraph=fullgraph)
+        logger.info(f"Model has been compiled with torch.compile(mode={mode}, fullgraph={fullgraph})")
+
     def _train_model(
         self,
         training_loader: DataLoader,
@@ -243,14 +269,14 @@ class USGAN(BaseNNImputer):
 
                     if idx % self.G_steps == 0:
                         self.G_optimizer.zero_grad()
-                        results = self.model.forward(inputs, training_object="generator")
+                        results = self._forward_generator(inputs)
                         results["loss"].backward()  # generation loss
                         self.G_optimizer.step()
                         step_train_loss_G_collector.append(results["loss"].item())
 
                     if idx % self.D_steps == 0:
                         self.D_optimizer.zero_grad()
-                        results = self.model.forward(inputs, training_object="discriminator")
+                        results = self._forward_discriminator(inputs)
                         results["loss"].backward(retain_graph=True)  # discrimination loss
                         self.D_optimizer.step()
                         step_train_loss_D_collector.append(results["loss"].item())
@@ -276,7 +302,7 @@ class USGAN(BaseNNImputer):
                     with torch.no_grad():
                         for idx, data in enumerate(val_loader):
                             inputs = self._assemble_input_for_validating(data)
-                            results = self.model.forward(inputs, training=False)
+                            results = self._forward_generator(inputs, training=False)
                             imputation_mse = (
                                 calc_mse(
                                     results["imputed_data"],
@@ -409,7 +435,7 @@ class USGAN(BaseNNImputer):
         with torch.no_grad():
             for idx, data in enumerate(test_loader):
                 inputs = self._assemble_input_for_testing(data)
-                results = self.model.forward(inputs, training=False)
+                results = self._forward_generator(inputs, training=False)
                 imputed_data = results["imputed_data"]
                 imputation_collector.append(imputed_data)
 
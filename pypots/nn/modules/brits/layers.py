@@ -10,7 +10,6 @@ import math
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torch.autograd import Variable
 from torch.nn.parameter import Parameter
 
 
@@ -65,5 +64,5 @@ class FeatureRegression(nn.Module):
             the processed result containing imputation from feature regression
 
         """
-        output = F.linear(x, self.W * Variable(self.m), self.b)
+        output = F.linear(x, self.W * self.m, self.b)
         return output
@@ -3,7 +3,6 @@ import math
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from torch.autograd import Variable
 from torch.nn.parameter import Parameter
 
 
@@ -71,7 +70,7 @@ class TemporalDecay(nn.Module):
             The temporal decay factor.
         """
         if self.diag:
-            gamma = F.relu(F.linear(delta, self.W * Variable(self.m), self.b))
+            gamma = F.relu(F.linear(delta, self.W * self.m, self.b))
         else:
             gamma = F.relu(F.linear(delta, self.W, self.b))
         gamma = torch.exp(-gamma)
@@ -18,10 +18,14 @@ This implementation is inspired by the official one https://github.com/WenjieDu/
 
 from .backbone import BackboneSAITS
 from .embedding import SaitsEmbedding
+from .layers import SaitsScaledDotProductAttention, SaitsMultiHeadAttention, SaitsEncoderLayer
 from .loss import SaitsLoss
 
 __all__ = [
     "BackboneSAITS",
     "SaitsEmbedding",
+    "SaitsScaledDotProductAttention",
+    "SaitsMultiHeadAttention",
+    "SaitsEncoderLayer",
     "SaitsLoss",
 ]
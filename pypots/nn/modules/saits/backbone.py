@@ -5,17 +5,20 @@
 # Created by Wenjie Du <wenjay.du@gmail.com>
 # License: BSD-3-Clause
 
+import inspect
+from functools import partial
 from typing import Optional, Tuple
 
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
 
 from .embedding import SaitsEmbedding
-from ..transformer import (
-    TransformerEncoderLayer,
-    ScaledDotProductAttention,
-)
+from .layers import SaitsScaledDotProductAttention, SaitsEncoderLayer
+
+# the non-reentrant checkpointing is only available in PyTorch >= 1.11, fall back to the reentrant one otherwise
+_CHECKPOINT_KWARGS = {"use_reentrant": False} if "use_reentrant" in inspect.signature(checkpoint).parameters else {}
 
 
 class BackboneSAITS(nn.Module):
@@ -31,8 +34,11 @@ class BackboneSAITS(nn.Module):
         d_ffn: int,
         dropout: float,
         attn_dropout: float,
+        gradient_checkpointing: bool = False,
+        memory_efficient_attention: bool = False,
     ):
         super().__init__()
+        self.gradient_checkpointing = gradient_checkpointing
 
         # concatenate the feature vector and missing mask, hence double the number of features
         actual_n_features = n_features * 2
@@ -47,8 +53,8 @@ class BackboneSAITS(nn.Module):
         )
         self.layer_stack_for_first_block = nn.ModuleList(
             [
-                TransformerEncoderLayer(
-                    ScaledDotProductAttention(d_k**0.5, attn_dropout),
+                SaitsEncoderLayer(
+                    SaitsScaledDotProductAttention(d_k**0.5, attn_dropout, memory_efficient_attention),
                     d_model,
                     n_heads,
                     d_k,
@@ -71,8 +77,8 @@ class BackboneSAITS(nn.Module):
         )
         self.layer_stack_for_second_block = nn.ModuleList(
             [
-                TransformerEncoderLayer(
-                    ScaledDotProductAttention(d_k**0.5, attn_dropout),
+                SaitsEncoderLayer(
+                    SaitsScaledDotProductAttention(d_k**0.5, attn_dropout, memory_efficient_attention),
                     d_model,
                     n_heads,
                     d_k,
@@ -90,21 +96,56 @@ class BackboneSAITS(nn.Module):
         # for delta decay factor
         self.weight_combine = nn.Linear(n_features + n_steps, n_features)
 
-    def forward(self, X, missing_mask, attn_mask: Optional = None) -> Tuple[torch.Tensor, ...]:
+    def _run_encoder_layer(
+        self,
+        encoder_layer: nn.Module,
+        enc_output: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+        need_weights: bool = True,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        if self.training and self.gradient_checkpointing:
+            # don't keep the activations of the layer, recompute them during the backward pass instead
+            # bind need_weights in advance, PyTorch < 2.0 doesn't forward keyword arguments through checkpoint()
+            return checkpoint(
+                partial(encoder_layer, need_weights=need_weights),
+                enc_output,
+                attn_mask,
+                **_CHECKPOINT_KWARGS,
+            )
+        return encoder_layer(enc_output, attn_mask, need_weights=need_weights)
+
+    def forward(
+        self,
+        X,
+        missing_mask,
+        attn_mask: Optional = None,
+        return_first_DMSA_attn_weights: bool = True,
+    ) -> Tuple[torch.Tensor, ...]:
+        # only attention weights from the last layer of each block get returned, and those from the 1st block
+        # are not involved in the computation, so other layers can run with the fused attention kernel
 
         # first DMSA block
         enc_output = self.embedding_1(X, missing_mask)  # namely, term e in the math equation
         first_DMSA_attn_weights = None
-        for encoder_layer in self.layer_stack_for_first_block:
-            enc_output, first_DMSA_attn_weights = encoder_layer(enc_output, attn_mask)
+        last_layer_idx = len(self.layer_stack_for_first_block) - 1
+        for idx, encoder_layer in enumerate(self.layer_stack_for_first_block):
+            need_weights = return_first_DMSA_attn_weights and idx == last_layer_idx
+            enc_output, first_DMSA_attn_weights = self._run_encoder_layer(
+                encoder_layer, enc_output, attn_mask, need_weights
+            )
         X_tilde_1 = self.reduce_dim_z(enc_output)
         X_prime = missing_mask * X + (1 - missing_mask) * X_tilde_1
 
         # second DMSA block
         enc_output = self.embedding_2(X_prime, missing_mask)  # namely term alpha in math algo
         second_DMSA_attn_weights = None
-        for encoder_layer in self.layer_stack_for_second_block:
-            enc_output, second_DMSA_attn_weights = encoder_layer(enc_output, attn_mask)
+        last_layer_idx = len(self.layer_stack_for_second_block) - 1
+        for idx, encoder_layer in enumerate(self.layer_stack_for_second_block):
+            # attention weights from the last layer are always needed by the weighted combination below
+            need_weights = idx == last_layer_idx
+            enc_output, second_DMSA_attn_weights = self._run_encoder_layer(
+                encoder_layer, enc_output, attn_mask, need_weights
+            )
         X_tilde_2 = self.reduce_dim_gamma(F.relu(self.reduce_dim_beta(enc_output)))
 
         # attention-weighted combine
@@ -0,0 +1,405 @@
+"""
+
+"""
+
+# Created by Wenjie Du <wenjay.du@gmail.com>
+# License: BSD-3-Clause
+
+import inspect
+from typing import Tuple, Optional
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.utils.checkpoint import checkpoint
+
+from ..transformer.attention import AttentionOperator
+from ..transformer.layers import PositionWiseFeedForward
+
+# the non-reentrant checkpointing is only available in PyTorch >= 1.11
+_NON_REENTRANT_CHECKPOINT_AVAILABLE = "use_reentrant" in inspect.signature(checkpoint).parameters
+
+
+class SaitsScaledDotProductAttention(AttentionOperator):
+    """The scaled dot-product attention used in the DMSA (diagonally-masked self-attention) blocks of SAITS.
+
+    If the attention map is not required by the caller, the attention will be computed with
+    :func:`torch.nn.functional.scaled_dot_product_attention`, which dispatches to fused kernels
+    (e.g. FlashAttention and memory-efficient attention) and never materializes the [n_steps, n_steps]
+    attention map. Otherwise, it falls back to the explicit computation to return the attention map.
+
+    Parameters
+    ----------
+    temperature:
+        The temperature for scaling.
+
+    attn_dropout:
+        The dropout rate for the attention map.
+
+    memory_efficient_attention:
+        Whether to compute the attention with the memory-efficient algorithm :cite:`rabe2021SelfAttention`
+        in pure PyTorch when the attention map is not required. It processes keys and values chunk by chunk and
+        combines the softmax results of the chunks, so the full [n_steps, n_steps] attention map is never
+        materialized. In training, each chunk is checkpointed and recomputed in the backward pass, hence the
+        attention map isn't kept for the backward either (this needs PyTorch >= 1.11, otherwise the chunks are kept
+        for the backward pass). It works on any device, and is helpful on CPUs or PyTorch versions without fused
+        attention kernels.
+
+    chunk_size:
+        The number of keys processed at a time in the memory-efficient attention.
+
+    """
+
+    def __init__(
+        self,
+        temperature: float,
+        attn_dropout: float = 0.1,
+        memory_efficient_attention: bool = False,
+        chunk_size: int = 128,
+    ):
+        super().__init__()
+        assert temperature > 0, "temperature should be positive"
+        assert attn_dropout >= 0, "dropout rate should be non-negative"
+        assert chunk_size > 0, "chunk_size should be positive"
+        self.temperature = temperature
+        self.attn_dropout = attn_dropout
+        self.memory_efficient_attention = memory_efficient_attention
+        self.chunk_size = chunk_size
+
+    def _attention_chunk(
+        self,
+        q: torch.Tensor,
+        k: torch.Tensor,
+        v: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        scores = torch.matmul(q, k.transpose(-2, -1))
+        if attn_mask is not None:
+            scores = scores.masked_fill(attn_mask == 0, torch.finfo(scores.dtype).min)
+
+        # softmax is invariant to the shift, so the max doesn't need gradients
+        chunk_max = scores.amax(dim=-1, keepdim=True).detach()
+        exp_scores = torch.exp(scores - chunk_max)
+        exp_sum = exp_scores.sum(dim=-1, keepdim=True)
+        if self.attn_dropout > 0:
+            # dropping the unnormalized weights equals dropping the normalized attention map,
+            # because the normalization factor is shared by the whole row
+            exp_scores = F.dropout(exp_scores, self.attn_dropout, self.training)
+        return torch.matmul(exp_scores, v), exp_sum, chunk_max
+
+    def _chunked_attention(
+        self,
+        q: torch.Tensor,
+        k: torch.Tensor,
+        v: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+    ) -> torch.Tensor:
+        # q, k, v are in shape of [batch_size, n_heads, n_steps, d_k or d_v]
+        q = q / self.temperature
+
+        chunk_values, chunk_sums, chunk_maxes = [], [], []
+        for start in range(0, k.size(-2), self.chunk_size):
+            end = start + self.chunk_size
+            chunk_args = (
+                q,
+                k[..., start:end, :],
+                v[..., start:end, :],
+                None if attn_mask is None else attn_mask[..., start:end],
+            )
+            if torch.is_grad_enabled() and _NON_REENTRANT_CHECKPOINT_AVAILABLE:
+                # don't keep the [n_steps, chunk_size] scores of every chunk for the backward pass, but recompute
+                # them chunk by chunk, otherwise the whole attention map would be kept in memory anyway
+                values, exp_sum, chunk_max = checkpoint(self._attention_chunk, *chunk_args, use_reentrant=False)
+            else:
+                values, exp_sum, chunk_max = self._attention_chunk(*chunk_args)
+            chunk_values.append(values)
+            chunk_sums.append(exp_sum)
+            chunk_maxes.append(chunk_max)
+
+        # rescale the results of all chunks with the global max, then normalize them
+        chunk_maxes = torch.stack(chunk_maxes)
+        scales = torch.exp(chunk_maxes - chunk_maxes.amax(dim=0))
+        output = (torch.stack(chunk_values) * scales).sum(dim=0)
+        return output / (torch.stack(chunk_sums) * scales).sum(dim=0)
+
+    def forward(
+        self,
+        q: torch.Tensor,
+        k: torch.Tensor,
+        v: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+        need_weights: bool = True,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Forward processing of the scaled dot-product attention.
+
+        Parameters
+        ----------
+        q:
+            Query tensor.
+
+        k:
+            Key tensor.
+
+        v:
+            Value tensor.
+
+        attn_mask:
+            Masking tensor for the attention map. The shape should be [batch_size, n_heads, n_steps, n_steps].
+            0 (or False) in attn_mask means values at the according position in the attention map will be masked out.
+
+        need_weights:
+            Whether to return the attention map. If not, the fused attention kernel will be used if available.
+
+        Returns
+        -------
+        output:
+            The result of Value multiplied with the scaled dot-product attention map.
+
+        attn:
+            The scaled dot-product attention map. It is None if ``need_weights`` is False.
+
+        """
+        # q, k, v all have 4 dimensions [batch_size, n_steps, n_heads, d_tensor]
+        # transpose for attention dot product: [batch_size, n_heads, n_steps, d_k or d_v]
+        q, k, v = q.transpose(1, 2), k.transpose(1, 2), v.transpose(1, 2)
+
+        if not need_weights and self.memory_efficient_attention:
+            return self._chunked_attention(q, k, v, attn_mask), None
+
+        if not need_weights and hasattr(F, "scaled_dot_product_attention"):
+            if attn_mask is not None and attn_mask.dtype != torch.bool:
+                # SDPA takes True as the position taking part in the attention
+                attn_mask = attn_mask != 0
+            # SDPA scales the attention map by 1/sqrt(d_k), rescale q to apply the given temperature
+            d_k_sqrt = q.size(-1) ** 0.5
+            if self.temperature != d_k_sqrt:
+                q = q * (d_k_sqrt / self.temperature)
+            output = F.scaled_dot_product_attention(
+                q,
+                k,
+                v,
+                attn_mask=attn_mask,
+                dropout_p=self.attn_dropout if self.training else 0.0,
+                is_causal=False,
+            )
+            return output, None
+
+        # dot product q with k.T to obtain similarity
+        attn = torch.matmul(q / self.temperature, k.transpose(2, 3))
+
+        # apply masking on the attention map, this is optional
+        if attn_mask is not None:
+            # -1e9 overflows in half precision, hence take the minimum of the dtype in that case
+            fill_value = -1e9 if attn.dtype == torch.float32 else torch.finfo(attn.dtype).min
+            attn = attn.masked_fill(attn_mask == 0, fill_value)
+
+        # compute attention score [0, 1], then apply dropout,
+        # which is fused into the attention kernel with dropout_p on the SDPA path above
+        attn = F.softmax(attn, dim=-1)
+        if self.attn_dropout > 0:
+            attn = F.dropout(attn, self.attn_dropout, self.training)
+
+        # multiply the score with v
+        output = torch.matmul(attn, v)
+        return output, attn
+
+
+class SaitsMultiHeadAttention(nn.Module):
+    """The multi-head self-attention module in the DMSA blocks of SAITS.
+
+    Different from :class:`pypots.nn.modules.transformer.MultiHeadAttention`, it only works for self-attention,
+    and it projects the input into queries, keys, and values with a single packed linear layer,
+    i.e. one GEMM rather than three.
+
+    Parameters
+    ----------
+    attn_opt:
+        The attention operator, e.g. the self-attention proposed in Transformer.
+
+    d_model:
+        The dimension of the input tensor.
+
+    n_heads:
+        The number of heads in multi-head attention.
+
+    d_k:
+        The dimension of the key and query tensor.
+
+    d_v:
+        The dimension of the value tensor.
+
+    """
+
+    def __init__(
+        self,
+        attn_opt: AttentionOperator,
+        d_model: int,
+        n_heads: int,
+        d_k: int,
+        d_v: int,
+    ):
+        super().__init__()
+
+        self.n_heads = n_heads
+        self.d_k = d_k
+        self.d_v = d_v
+
+        self.w_qkv = nn.Linear(d_model, n_heads * (2 * d_k + d_v), bias=False)
+
+        self.attention_operator = attn_opt
+        self.fc = nn.Linear(n_heads * d_v, d_model, bias=False)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # pack the separate Q/K/V projection weights from checkpoints saved before the fusion
+        separate_keys = [f"{prefix}w_qs.weight", f"{prefix}w_ks.weight", f"{prefix}w_vs.weight"]
+        if all(key in state_dict for key in separate_keys):
+            state_dict[f"{prefix}w_qkv.weight"] = torch.cat([state_dict.pop(key) for key in separate_keys], dim=0)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        attn_mask: Optional[torch.Tensor],
+        **kwargs,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Forward processing of the multi-head self-attention module.
+
+        Parameters
+        ----------
+        x:
+            Input tensor, which works as the query, key, and value at the same time.
+
+        attn_mask:
+            Masking tensor for the attention map. The shape should be [batch_size, n_steps, n_steps].
+            0 (or False) in attn_mask means values at the according position in the attention map will be masked out.
+
+        Returns
+        -------
+        v:
+            The output of the multi-head attention layer.
+
+        attn_weights:
+            The attention map.
+
+        """
+        # the shape of x is [batch_size, n_steps, d_model]
+        batch_size, n_steps = x.size(0), x.size(1)
+
+        # project x into q, k, v all at once, then separate the last dimension of them into different heads
+        # -> [batch_size, n_steps, n_heads, d_k or d_v]
+        q, k, v = self.w_qkv(x).split(
+            [self.n_heads * self.d_k, self.n_heads * self.d_k, self.n_heads * self.d_v],
+            dim=-1,
+        )
+        q = q.view(batch_size, n_steps, self.n_heads, self.d_k)
+        k = k.view(batch_size, n_steps, self.n_heads, self.d_k)
+        v = v.view(batch_size, n_steps, self.n_heads, self.d_v)
+
+        if attn_mask is not None:
+            # broadcasting on the head axis
+            attn_mask = attn_mask.unsqueeze(1)
+
+        v, attn_weights = self.attention_operator(q, k, v, attn_mask, **kwargs)
+
+        # transpose back -> [batch_size, n_steps, n_heads, d_v]
+        # then merge the last two dimensions to combine all the heads -> [batch_size, n_steps, n_heads*d_v]
+        v = v.transpose(1, 2).contiguous().view(batch_size, n_steps, -1)
+        v = self.fc(v)
+
+        return v, attn_weights
+
+
+class SaitsEncoderLayer(nn.Module):
+    """The encoder layer in the DMSA blocks of SAITS.
+
+    It has the same structure as :class:`pypots.nn.modules.transformer.TransformerEncoderLayer`,
+    but uses :class:`SaitsMultiHeadAttention` with the packed QKV projection as the self-attention module.
+
+    Parameters
+    ----------
+    attn_opt:
+        The attention operator for the multi-head attention module in the encoder layer.
+
+    d_model:
+        The dimension of the input tensor.
+
+    n_heads:
+        The number of heads in multi-head attention.
+
+    d_k:
+        The dimension of the key and query tensor.
+
+    d_v:
+        The dimension of the value tensor.
+
+    d_ffn:
+        The dimension of the hidden layer.
+
+    dropout:
+        The dropout rate.
+
+    """
+
+    def __init__(
+        self,
+        attn_opt: AttentionOperator,
+        d_model: int,
+        n_heads: int,
+        d_k: int,
+        d_v: int,
+        d_ffn: int,
+        dropout: float = 0.1,
+    ):
+        super().__init__()
+        self.slf_attn = SaitsMultiHeadAttention(
+            attn_opt,
+            d_model,
+            n_heads,
+            d_k,
+            d_v,
+        )
+        self.dropout = nn.Dropout(dropout)
+        self.layer_norm = nn.LayerNorm(d_model, eps=1e-6)
+        self.pos_ffn = PositionWiseFeedForward(d_model, d_ffn, dropout)
+
+    def forward(
+        self,
+        enc_input: torch.Tensor,
+        src_mask: Optional[torch.Tensor] = None,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Forward processing of the encoder layer.
+
+        Parameters
+        ----------
+        enc_input:
+            Input tensor.
+
+        src_mask:
+            Masking tensor for the attention map. The shape should be [batch_size, n_steps, n_steps].
+
+        Returns
+        -------
+        enc_output:
+            Output tensor.
+
+        attn_weights:
+            The attention map.
+
+        """
+        enc_output, attn_weights = self.slf_attn(
+            enc_input,
+            attn_mask=src_mask,
+            **kwargs,
+        )
+
+        # apply dropout and residual connection
+        enc_output = self.dropout(enc_output)
+        enc_output += enc_input
+
+        # apply layer-norm
+        enc_output = self.layer_norm(enc_output)
+
+        enc_output = self.pos_ffn(enc_output)
+        return enc_output, attn_weights
@@ -5,7 +5,7 @@
 # Created by Jun Wang <jwangfx@connect.ust.hk> and Wenjie Du <wenjay.du@gmail.com>
 # License: BSD-3-Clause
 
-from typing import Tuple
+from typing import Tuple, Optional, Union
 
 import torch
 import torch.nn as nn
@@ -39,12 +39,12 @@ class BackboneUSGAN(nn.Module):
             dropout_rate,
         )
 
-    def forward(
+    def forward_generator(
         self,
         inputs: dict,
-        training_object: str = "generator",
         training: bool = True,
-    ) -> Tuple[torch.Tensor, ...]:
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Run the generator, and calculate the generation loss if in training mode, otherwise the loss is None."""
         (
             imputed_data,
             f_reconstruction,
@@ -55,29 +55,58 @@ class BackboneUSGAN(nn.Module):
             _,
         ) = self.generator(inputs)
 
+        if not training:
+            return imputed_data, None
+
+        forward_X = inputs["forward"]["X"]
+        forward_missing_mask = inputs["forward"]["missing_mask"]
+
+        discrimination = self.discriminator(imputed_data, forward_missing_mask)
+        l_G = -F.binary_cross_entropy_with_logits(
+            discrimination,
+            forward_missing_mask,
+            weight=1 - forward_missing_mask,
+        )
+        reconstruction = (f_reconstruction + b_reconstruction) / 2
+        reconstruction_loss = calc_mse(forward_X, reconstruction, forward_missing_mask) + 0.1 * calc_mse(
+            f_reconstruction, b_reconstruction
+        )
+        generation_loss = l_G + self.lambda_mse * reconstruction_loss
+        return imputed_data, generation_loss
+
+    def forward_discriminator(
+        self,
+        inputs: dict,
+        training: bool = True,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Run the discriminator on the generated data, and calculate the discrimination loss if in training mode,
+        otherwise the loss is None."""
+        imputed_data = self.generator(inputs)[0]
+
+        if not training:
+            return imputed_data, None
+
+        forward_missing_mask = inputs["forward"]["missing_mask"]
+
+        discrimination = self.discriminator(imputed_data.detach(), forward_missing_mask)
+        discrimination_loss = F.binary_cross_entropy_with_logits(discrimination, forward_missing_mask)
+        return imputed_data, discrimination_loss
+
+    def forward(
+        self,
+        inputs: dict,
+        training_object: str = "generator",
+        training: bool = True,
+    ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        if training_object == "generator":
+            imputed_data, loss = self.forward_generator(inputs, training)
+        elif training_object == "discriminator":
+            imputed_data, loss = self.forward_discriminator(inputs, training)
+        else:
+            raise ValueError(f'training_object should be "generator" or "discriminator", but got {training_object}')
+
         # if in training mode, return results with losses
         if training:
-            forward_X = inputs["forward"]["X"]
-            forward_missing_mask = inputs["forward"]["missing_mask"]
-
-            if training_object == "discriminator":
-                discrimination = self.discriminator(imputed_data.detach(), forward_missing_mask)
-                l_D = F.binary_cross_entropy_with_logits(discrimination, forward_missing_mask)
-                discrimination_loss = l_D
-                return imputed_data, discrimination_loss
-            else:
-                discrimination = self.discriminator(imputed_data, forward_missing_mask)
-                l_G = -F.binary_cross_entropy_with_logits(
-                    discrimination,
-                    forward_missing_mask,
-                    weight=1 - forward_missing_mask,
-                )
-                reconstruction = (f_reconstruction + b_reconstruction) / 2
-                reconstruction_loss = calc_mse(forward_X, reconstruction, forward_missing_mask) + 0.1 * calc_mse(
-                    f_reconstruction, b_reconstruction
-                )
-                loss_gene = l_G + self.lambda_mse * reconstruction_loss
-                generation_loss = loss_gene
-                return imputed_data, generation_loss
+            return imputed_data, loss
         else:
             return imputed_data
@@ -34,6 +34,14 @@ class Adam(Optimizer):
     amsgrad : bool
         Whether to use the AMSGrad variant of this algorithm from the paper :cite:`reddi2018OnTheConvergence`.
 
+    foreach : bool
+        Whether to use the foreach (multi-tensor) implementation, which updates all parameters with a few batched
+        kernels rather than looping over them one by one. If None, PyTorch will decide it.
+
+    fused : bool
+        Whether to use the fused implementation, which updates all parameters in a single fused kernel.
+        It only works when all parameters are on CUDA. If None, it will be enabled when all parameters are on CUDA.
+
     lr_scheduler : pypots.optim.lr_scheduler.base.LRScheduler
         The learning rate scheduler of the optimizer.
     """
@@ -45,6 +53,8 @@ class Adam(Optimizer):
         eps: float = 1e-08,
         weight_decay: float = 0,
         amsgrad: bool = False,
+        foreach: Optional[bool] = True,
+        fused: Optional[bool] = None,
         lr_scheduler: Optional[LRScheduler] = None,
     ):
         super().__init__(lr, lr_scheduler)
@@ -52,6 +62,8 @@ class Adam(Optimizer):
         self.eps = eps
         self.weight_decay = weight_decay
         self.amsgrad = amsgrad
+        self.foreach = foreach
+        self.fused = fused
 
     def init_optimizer(self, params: Iterable) -> None:
         """Initialize the torch optimizer wrapped by this class.
@@ -62,6 +74,7 @@ class Adam(Optimizer):
             An iterable of ``torch.Tensor`` or ``dict``. Specifies what Tensors should be optimized.
 
         """
+        params = list(params)
         self.torch_optimizer = torch_Adam(
             params=params,
             lr=self.lr,
@@ -69,6 +82,7 @@ class Adam(Optimizer):
             eps=self.eps,
             weight_decay=self.weight_decay,
             amsgrad=self.amsgrad,
+            **self._get_multi_tensor_kwargs(torch_Adam, params, self.foreach, self.fused),
         )
 
         if self.lr_scheduler is not None:
@@ -17,9 +17,12 @@ in one place, which could result in a mess and be not readable;
 # License: BSD-3-Clause
 
 
+import inspect
 from abc import ABC, abstractmethod
 from typing import Callable, Iterable, Optional
 
+import torch
+
 from .lr_scheduler.base import LRScheduler
 
 
@@ -57,6 +60,52 @@ class Optimizer(ABC):
         """
         raise NotImplementedError
 
+    @staticmethod
+    def _get_multi_tensor_kwargs(
+        torch_optimizer_class: type,
+        params: list,
+        foreach: Optional[bool] = None,
+        fused: Optional[bool] = None,
+    ) -> dict:
+        """Get the arguments `foreach` and `fused` for the torch optimizer.
+
+        Parameters
+        ----------
+        torch_optimizer_class :
+            The class of the torch optimizer to initialize.
+
+        params :
+            A list of ``torch.Tensor`` or ``dict``. Specifies what Tensors should be optimized.
+
+        foreach :
+            Whether to use the foreach (multi-tensor) implementation.
+
+        fused :
+            Whether to use the fused implementation. If None, it will be enabled when all parameters are on CUDA.
+
+        Returns
+        -------
+        kwargs :
+            The arguments supported by the installed PyTorch version, empty if none of them is supported.
+
+        """
+        supported_args = inspect.signature(torch_optimizer_class).parameters
+        kwargs = {}
+
+        if fused is None:
+            tensors = []
+            for param in params:
+                tensors.extend(param["params"] if isinstance(param, dict) else [param])
+            fused = len(tensors) > 0 and all(isinstance(t, torch.Tensor) and t.is_cuda for t in tensors)
+
+        if fused and "fused" in supported_args:
+            # fused and foreach can't be both enabled, and the fused one is the faster
+            kwargs["fused"] = True
+        elif "foreach" in supported_args:
+            kwargs["foreach"] = foreach
+
+        return kwargs
+
     def add_param_group(self, param_group: dict) -> None:
         """Add a param group to the optimizer param_groups.
 
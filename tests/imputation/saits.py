@@ -11,8 +11,17 @@ import unittest
 
 import numpy as np
 import pytest
+import torch
 
 from pypots.imputation import SAITS
+from pypots.nn.modules.saits import (
+    SaitsScaledDotProductAttention,
+    SaitsMultiHeadAttention,
+)
+from pypots.nn.modules.transformer import (
+    ScaledDotProductAttention,
+    MultiHeadAttention,
+)
 from pypots.optim import Adam
 from pypots.utils.logging import logger
 from pypots.utils.metrics import calc_mse
@@ -32,6 +41,37 @@ from tests.global_test_config import (
 )
 
 
+def init_small_saits(**kwargs) -> SAITS:
+    return SAITS(
+        DATA["n_steps"],
+        DATA["n_features"],
+        n_layers=2,
+        d_model=32,
+        n_heads=2,
+        d_k=16,
+        d_v=16,
+        d_ffn=32,
+        dropout=0.1,
+        attn_dropout=0.1,
+        epochs=EPOCHS,
+        device=DEVICE,
+        **kwargs,
+    )
+
+
+def assemble_training_inputs(saits: SAITS, n_samples: int = 16) -> dict:
+    X = torch.from_numpy(DATA["train_X"][:n_samples]).float()
+    missing_mask = (~torch.isnan(X)).float()
+    X = torch.nan_to_num(X)
+    inputs = {
+        "X": X,
+        "missing_mask": missing_mask,
+        "X_ori": X,
+        "indicating_mask": missing_mask,
+    }
+    return {key: value.to(saits.device) for key, value in inputs.items()}
+
+
 class TestSAITS(unittest.TestCase):
     logger.info("Running tests for an imputation model SAITS...")
 
@@ -132,6 +172,188 @@ class TestSAITS(unittest.TestCase):
         )
         logger.info(f"Lazy-loading SAITS test_MSE: {test_MSE}")
 
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_5_gradient_checkpointing(self):
+        saits = init_small_saits()
+        saits_ckpt = init_small_saits(gradient_checkpointing=True)
+        saits_ckpt.model.load_state_dict(saits.model.state_dict())
+        inputs = assemble_training_inputs(saits)
+
+        grads = []
+        for model in [saits.model, saits_ckpt.model]:
+            model.train()
+            # the same seed gives the same dropout masks, checkpoint() restores the RNG state when recomputing
+            torch.manual_seed(0)
+            model(inputs)["loss"].backward()
+            grads.append({name: param.grad for name, param in model.named_parameters()})
+
+        for name, grad in grads[0].items():
+            assert torch.allclose(
+                grad, grads[1][name], atol=1e-6
+            ), f"gradients of {name} mismatch with gradient checkpointing"
+
+        saits_ckpt.fit(TRAIN_SET, VAL_SET)
+        imputation_results = saits_ckpt.predict(TEST_SET)
+        assert not np.isnan(
+            imputation_results["imputation"]
+        ).any(), "Output still has missing values after running impute()."
+
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_6_quantize(self):
+        saits = init_small_saits()
+        saits.fit(TRAIN_SET, VAL_SET)
+        float_imputation = saits.predict(TEST_SET)["imputation"]
+
+        saits.quantize()
+        quantized_linear_layers = [
+            module
+            for module in saits.model.modules()
+            if isinstance(module, torch.ao.nn.quantized.dynamic.Linear)
+        ]
+        assert len(quantized_linear_layers) > 0
+        assert not any(
+            type(module) is torch.nn.Linear for module in saits.model.modules()
+        ), "Some linear layers are not quantized."
+
+        imputation_results = saits.predict(TEST_SET, return_latent_vars=True)
+        assert "latent_vars" in imputation_results
+        max_diff = np.abs(imputation_results["imputation"] - float_imputation).max()
+        assert (
+            max_diff < 0.1
+        ), f"The quantized model deviates too much from the float one: {max_diff}"
+
+        with pytest.raises(RuntimeError):
+            saits.fit(TRAIN_SET)
+
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_7_fused_attention(self):
+        # the fused SDPA path should match the explicit computation, including the temperature and mask handling
+        q, k, v = torch.randn(3, 2, DATA["n_steps"], 2, 16).unbind(0)
+        diagonal_mask = ~torch.eye(DATA["n_steps"], dtype=torch.bool)[None, None]
+        for temperature in [16**0.5, 2.0]:
+            attention = SaitsScaledDotProductAttention(
+                temperature, attn_dropout=0.1
+            ).eval()
+            for attn_mask in [None, diagonal_mask, diagonal_mask.float()]:
+                fused_output, fused_attn = attention(
+                    q, k, v, attn_mask, need_weights=False
+                )
+                explicit_output, explicit_attn = attention(
+                    q, k, v, attn_mask, need_weights=True
+                )
+                assert fused_attn is None and explicit_attn is not None
+                assert torch.allclose(fused_output, explicit_output, atol=1e-5)
+
+        # only the last layers of the DMSA blocks whose attention maps are needed run the explicit path
+        saits = init_small_saits()
+        saits.model.eval()
+        inputs = assemble_training_inputs(saits)
+        with torch.no_grad():
+            for diagonal_attention_mask in [True, False]:
+                fused_results = saits.model(
+                    inputs, diagonal_attention_mask, training=False
+                )
+                explicit_results = saits.model(
+                    inputs,
+                    diagonal_attention_mask,
+                    training=False,
+                    return_latent_vars=True,
+                )
+                assert fused_results["first_DMSA_attn_weights"] is None
+                assert explicit_results["first_DMSA_attn_weights"] is not None
+                assert fused_results["second_DMSA_attn_weights"] is not None
+                assert torch.allclose(
+                    fused_results["imputed_data"],
+                    explicit_results["imputed_data"],
+                    atol=1e-5,
+                )
+
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_8_compile(self):
+        from torch._dynamo.utils import counters
+
+        counters.clear()
+        saits = init_small_saits(compile=True)
+        imputation_results = saits.predict(TEST_SET)
+        assert not np.isnan(
+            imputation_results["imputation"]
+        ).any(), "Output still has missing values after running impute()."
+        assert (
+            counters["stats"]["unique_graphs"] > 0
+        ), "No graph was captured by torch.compile."
+
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_9_loading_separate_qkv_weights(self):
+        # checkpoints saved before packing the QKV projections have separate w_qs/w_ks/w_vs,
+        # which are in the same layout as the ones in the Transformer's multi-head attention
+        d_model, n_heads, d_k, d_v = 32, 2, 16, 16
+        separate_qkv_attn = MultiHeadAttention(
+            ScaledDotProductAttention(d_k**0.5, 0), d_model, n_heads, d_k, d_v
+        ).eval()
+        packed_qkv_attn = SaitsMultiHeadAttention(
+            SaitsScaledDotProductAttention(d_k**0.5, 0), d_model, n_heads, d_k, d_v
+        ).eval()
+        incompatible_keys = packed_qkv_attn.load_state_dict(
+            separate_qkv_attn.state_dict()
+        )
+        assert not incompatible_keys.missing_keys
+        assert not incompatible_keys.unexpected_keys
+
+        x = torch.randn(4, DATA["n_steps"], d_model)
+        attn_mask = ~torch.eye(DATA["n_steps"], dtype=torch.bool).unsqueeze(0)
+        with torch.no_grad():
+            expected_output, expected_attn = separate_qkv_attn(x, x, x, attn_mask)
+            output, attn = packed_qkv_attn(x, attn_mask)
+        assert torch.allclose(output, expected_output, atol=1e-6)
+        assert torch.allclose(attn, expected_attn, atol=1e-6)
+
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_10_memory_efficient_attention(self):
+        # the chunked attention should match the explicit computation in both outputs and gradients,
+        # chunk_size=3 makes the last chunk shorter than the others
+        attention = SaitsScaledDotProductAttention(
+            16**0.5, attn_dropout=0, memory_efficient_attention=True, chunk_size=3
+        )
+        diagonal_mask = ~torch.eye(DATA["n_steps"], dtype=torch.bool)[None, None]
+        for attn_mask in [None, diagonal_mask]:
+            q, k, v = torch.randn(3, 2, DATA["n_steps"], 2, 16).unbind(0)
+            q, k, v = [x.requires_grad_() for x in (q, k, v)]
+            chunked_output, _ = attention(q, k, v, attn_mask, need_weights=False)
+            chunked_grads = torch.autograd.grad(chunked_output.sum(), (q, k, v))
+            explicit_output, _ = attention(q, k, v, attn_mask, need_weights=True)
+            explicit_grads = torch.autograd.grad(explicit_output.sum(), (q, k, v))
+            assert torch.allclose(chunked_output, explicit_output, atol=1e-5)
+            for chunked_grad, explicit_grad in zip(chunked_grads, explicit_grads):
+                assert torch.allclose(chunked_grad, explicit_grad, atol=1e-5)
+
+        saits = init_small_saits(memory_efficient_attention=True)
+        saits.fit(TRAIN_SET, VAL_SET)
+        imputation_results = saits.predict(TEST_SET)
+        assert not np.isnan(
+            imputation_results["imputation"]
+        ).any(), "Output still has missing values after running impute()."
+
+    @pytest.mark.xdist_group(name="imputation-saits")
+    def test_11_mixed_precision(self):
+        with pytest.raises(AssertionError):
+            init_small_saits(precision="fp8")
+
+        saits = init_small_saits(precision="bf16")
+        for return_latent_vars in [False, True]:
+            imputation_results = saits.predict(
+                TEST_SET, return_latent_vars=return_latent_vars
+            )
+            # the results are cast back to float32 from the bf16 autocast region
+            imputation = imputation_results["imputation"]
+            assert imputation.dtype == np.float32
+            assert not np.isnan(
+                imputation
+            ).any(), "Output still has missing values after running impute()."
+            if return_latent_vars:
+                for latent_var in imputation_results["latent_vars"].values():
+                    assert latent_var.dtype == np.float32
+                    assert not np.isnan(latent_var).any()
+
 
 if __name__ == "__main__":
     unittest.main()
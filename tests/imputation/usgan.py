@@ -11,8 +11,10 @@ import unittest
 
 import numpy as np
 import pytest
+from torch.utils.data import DataLoader
 
 from pypots.imputation import USGAN
+from pypots.imputation.usgan.data import DatasetForUSGAN
 from pypots.optim import Adam
 from pypots.utils.logging import logger
 from pypots.utils.metrics import calc_mse
@@ -116,6 +118,55 @@ class TestUSGAN(unittest.TestCase):
         )
         logger.info(f"Lazy-loading US-GAN test_MSE: {test_MSE}")
 
+    @pytest.mark.xdist_group(name="imputation-usgan")
+    def test_5_separate_forward(self):
+        usgan = USGAN(
+            DATA["n_steps"],
+            DATA["n_features"],
+            32,
+            epochs=EPOCHS,
+            device=DEVICE,
+        )
+        dataset = DatasetForUSGAN(TRAIN_SET, return_X_ori=False, return_y=False)
+        data = next(iter(DataLoader(dataset, batch_size=16)))
+        inputs = usgan._assemble_input_for_training(data)
+
+        for forward in [
+            usgan.model.forward_generator,
+            usgan.model.forward_discriminator,
+        ]:
+            # losses are returned only in training mode
+            assert forward(inputs, training=True)["loss"] is not None
+            assert "loss" not in forward(inputs, training=False)
+
+        backbone = usgan.model.backbone
+        for forward in [backbone.forward_generator, backbone.forward_discriminator]:
+            imputed_data, loss = forward(inputs, training=True)
+            assert loss is not None
+            imputed_data, loss = forward(inputs, training=False)
+            assert loss is None
+
+        # the forward() shim still dispatches on the training object, and rejects unknown ones
+        assert "loss" in usgan.model(inputs, training_object="discriminator")
+        with pytest.raises(ValueError):
+            usgan.model(inputs, training_object="encoder")
+
+    @pytest.mark.xdist_group(name="imputation-usgan")
+    def test_6_compile(self):
+        usgan = USGAN(
+            DATA["n_steps"],
+            DATA["n_features"],
+            32,
+            epochs=EPOCHS,
+            compile=True,
+            device=DEVICE,
+        )
+        usgan.fit(TRAIN_SET, VAL_SET)
+        imputed_X = usgan.impute(TEST_SET)
+        assert not np.isnan(
+            imputed_X
+        ).any(), "Output still has missing values after running impute()."
+
 
 if __name__ == "__main__":
     unittest.main()
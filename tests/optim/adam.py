@@ -9,6 +9,7 @@ import unittest
 
 import numpy as np
 import pytest
+import torch
 
 from pypots.imputation import SAITS
 from pypots.optim import Adam
@@ -51,6 +52,31 @@ class TestAdam(unittest.TestCase):
         )
         logger.info(f"SAITS test_MAE: {test_MAE}")
 
+    @pytest.mark.xdist_group(name="optim-adam")
+    def test_1_multi_tensor_kwargs(self):
+        # the foreach implementation is passed for the parameters on CPU, without fused
+        params = [torch.nn.Parameter(torch.randn(4, 4))]
+        adam = Adam(lr=0.001, foreach=True)
+        adam.init_optimizer(params)
+        assert adam.torch_optimizer.defaults["foreach"] is True
+        assert not adam.torch_optimizer.defaults.get("fused")
+
+        # fused is never passed together with foreach
+        kwargs = Adam._get_multi_tensor_kwargs(
+            torch.optim.Adam, params, foreach=True, fused=True
+        )
+        assert kwargs == {"fused": True}
+
+        # the arguments not accepted by the installed torch optimizer are dropped
+        class LegacyOptimizer(torch.optim.Optimizer):
+            def __init__(self, params, lr=0.001):
+                super().__init__(params, dict(lr=lr))
+
+        kwargs = Adam._get_multi_tensor_kwargs(
+            LegacyOptimizer, params, foreach=True, fused=True
+        )
+        assert kwargs == {}
+
 
 if __name__ == "__main__":
     unittest.main()